@@ -1,7 +1,10 @@
 import chromadb
 from chromadb.config import Settings
-from typing import List, Dict, Any
-from .logger_config import get_logger, log_time
+from typing import List, Dict, Any, Optional, Tuple
+from .logger_config import get_logger, log_time, sample_retrieval_logs, RETRIEVAL_LOGGER_NAME
+from .file_spool import open_mapped
+from .embedding_service import RemoteEmbeddingFunction
+import logging
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -9,8 +12,7 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from chromadb.utils import embedding_functions
 from markitdown import MarkItDown
 import mimetypes
-import asyncio
-from io import BytesIO
+import uuid
 from pdfminer.high_level import extract_text as pdf_extract_text
 from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
 from pdfminer.converter import TextConverter
@@ -26,11 +28,21 @@ env_path = root_dir / '.env'
 load_dotenv(dotenv_path=env_path)
 
 logger = get_logger(__name__)
+retrieval_logger = get_logger(RETRIEVAL_LOGGER_NAME)
 
 logger.info(f"Loading environment variables from: {env_path}")
 logger.debug(f"CHUNK_SIZE: {os.getenv('CHUNK_SIZE')}")
 logger.debug(f"CHUNK_OVERLAP: {os.getenv('CHUNK_OVERLAP')}")
 
+class CollectionNotFoundError(ValueError):
+    pass
+
+def is_collection_not_found(error: Exception) -> bool:
+    """Chroma reports a missing collection as NotFoundError, InvalidCollectionException or a ValueError depending on its version"""
+    if type(error).__name__ in ('NotFoundError', 'InvalidCollectionException'):
+        return True
+    return isinstance(error, ValueError) and 'does not exist' in str(error)
+
 class ChromaDocStore:
     def __init__(self):
         self.settings = Settings(
@@ -39,30 +51,156 @@ class ChromaDocStore:
             is_persistent=os.getenv('CHROMA_IS_PERSISTENT', 'true').lower() == 'true'
         )
         
-        self.client = chromadb.Client(self.settings)
-        self.collection_name = "documents"
+        # "embedded" keeps the store in this process, "http" talks to a shared Chroma server
+        self.mode = os.getenv('CHROMA_MODE', 'embedded').lower()
+        if self.mode == 'http':
+            host = os.getenv('CHROMA_HOST', 'localhost')
+            port = int(os.getenv('CHROMA_PORT', 8002))
+            self.client = chromadb.HttpClient(host=host, port=port, settings=self.settings)
+            logger.info(f"Connected to Chroma server at {host}:{port}")
+        else:
+            self.client = chromadb.Client(self.settings)
+        self.collection_name = os.getenv('CHROMA_DEFAULT_COLLECTION', 'documents')
+
+        # Default HNSW index settings for newly created collections
+        self.hnsw_defaults = {
+            'space': os.getenv('HNSW_SPACE', 'l2'),
+            'm': int(os.getenv('HNSW_M', 16)),
+            'construction_ef': int(os.getenv('HNSW_CONSTRUCTION_EF', 100)),
+            'search_ef': int(os.getenv('HNSW_SEARCH_EF', 10))
+        }
+        # Cached collection handles, refreshed when another worker has recreated the collection
+        self.collections = {}
         
         # Load configuration from environment variables
         self.n_results = int(os.getenv('N_RESULTS', 5))
         self.distance_threshold = float(os.getenv('DISTANCE_THRESHOLD', 1.5))
 
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="all-MiniLM-L6-v2"
-        )
+        self.embedding_model_name = os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+        if os.getenv('EMBEDDING_SERVICE_URL'):
+            # Share one embedding model between all workers
+            self.embedding_function = RemoteEmbeddingFunction(expected_model=self.embedding_model_name)
+        else:
+            self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
+                model_name=self.embedding_model_name
+            )
         
-        self.collection = self.client.get_or_create_collection(
-            name=self.collection_name,
-            embedding_function=self.embedding_function
-        )
+        self.get_or_create_collection(self.collection_name)
         
         self.chunk_size = int(os.getenv('CHUNK_SIZE', 1000))
         self.chunk_overlap = int(os.getenv('CHUNK_OVERLAP', 200))
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
+        self.text_splitter = self.make_text_splitter(self.chunk_size, self.chunk_overlap)
+        logger.info(f"Initialized ChromaDocStore with chunk_size={self.chunk_size}, chunk_overlap={self.chunk_overlap}")
+
+    @property
+    def collection(self):
+        return self.get_collection()
+
+    def _hnsw_metadata(self, space: str = None, m: int = None, construction_ef: int = None, search_ef: int = None) -> Dict[str, Any]:
+        return {
+            'hnsw:space': space or self.hnsw_defaults['space'],
+            'hnsw:M': m or self.hnsw_defaults['m'],
+            'hnsw:construction_ef': construction_ef or self.hnsw_defaults['construction_ef'],
+            'hnsw:search_ef': search_ef or self.hnsw_defaults['search_ef']
+        }
+
+    def get_collection(self, name: str = None):
+        """Return a named collection, raising CollectionNotFoundError if it does not exist"""
+        name = name or self.collection_name
+        if name not in self.collections:
+            try:
+                collection = self.client.get_collection(name=name, embedding_function=self.embedding_function)
+            except Exception as e:
+                # Connection errors and other failures are not a missing collection
+                if not is_collection_not_found(e):
+                    raise
+                raise CollectionNotFoundError(f"Collection {name} does not exist") from e
+            self.collections[name] = collection
+        return self.collections[name]
+
+    def with_collection(self, name: str, operation, create: bool = False):
+        """
+        Run an operation on a cached collection handle.
+
+        A handle goes stale when another worker deletes and recreates the
+        collection, in which case it is looked up again and the operation retried once.
+        """
+        lookup = self.get_or_create_collection if create else self.get_collection
+        collection = lookup(name)
+        try:
+            return operation(collection)
+        except Exception as e:
+            if not is_collection_not_found(e):
+                raise
+            self.collections.pop(collection.name, None)
+            return operation(lookup(name))
+
+    def get_or_create_collection(self, name: str = None):
+        """Return a named collection, creating it with the default HNSW settings if it does not exist"""
+        # Looked up first, as get_or_create in older Chroma versions overwrites the metadata of existing collections
+        try:
+            return self.get_collection(name)
+        except CollectionNotFoundError:
+            pass
+        try:
+            return self.create_collection(name or self.collection_name)
+        except Exception:
+            # Another worker may have created the collection in the meantime
+            try:
+                return self.get_collection(name)
+            except CollectionNotFoundError:
+                pass
+            raise
+
+    @log_time(logger)
+    def create_collection(self, name: str, space: str = None, m: int = None, construction_ef: int = None, search_ef: int = None):
+        """
+        Create a named collection with its own HNSW index settings.
+
+        Args:
+            name: Collection name
+            space: Distance metric, one of "l2", "cosine" or "ip"
+            m: Maximum number of neighbours per node in the HNSW graph
+            construction_ef: Size of the candidate list while building the index
+            search_ef: Size of the candidate list while searching
+        """
+        metadata = self._hnsw_metadata(space, m, construction_ef, search_ef)
+        collection = self.client.create_collection(
+            name=name,
+            embedding_function=self.embedding_function,
+            metadata=metadata
+        )
+        self.collections[name] = collection
+        logger.info(f"Created collection {name} with {metadata}")
+        return collection
+
+    def delete_collection(self, name: str):
+        """Delete a collection with all of its documents"""
+        self.client.delete_collection(name=name)
+        self.collections.pop(name, None)
+        logger.info(f"Deleted collection {name}")
+
+    def list_collections(self) -> List[Dict[str, Any]]:
+        """List all collections with their sizes and index settings"""
+        collections = []
+        for collection in self.client.list_collections():
+            # Newer Chroma versions return collection names instead of collection objects
+            name = collection if isinstance(collection, str) else collection.name
+            collection = self.get_collection(name)
+            collections.append({
+                'name': name,
+                'count': self.with_collection(name, lambda c: c.count()),
+                'metadata': collection.metadata or {}
+            })
+        return collections
+
+    @staticmethod
+    def make_text_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+        return RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
             separators=["\n\n##", "\n\n", "\n", ". ", " ", ""]
         )
-        logger.info(f"Initialized ChromaDocStore with chunk_size={self.chunk_size}, chunk_overlap={self.chunk_overlap}")
 
     @staticmethod
     def extract_text_from_pdf(file_obj) -> list:
@@ -90,13 +228,13 @@ class ChromaDocStore:
         return page_texts
 
     @staticmethod
-    async def extract_text_from_document(file_obj) -> List[Dict[str, any]]:
+    def extract_text_from_file(path, file_name: str = None) -> List[Dict[str, any]]:
         """
-        Extract text from a document, handling PDFs with pdfminer.six and other formats with MarkItDown.
+        Extract text from a file on disk, handling PDFs with pdfminer.six and other formats with MarkItDown.
+        PDFs are read through a memory map, other formats are converted from the file path.
         """
+        file_name = file_name or Path(path).name
         try:
-            # Get the file name from the file object
-            file_name = getattr(file_obj, 'filename', None) or getattr(file_obj, 'name', 'unknown')
             file_type = mimetypes.guess_type(file_name)[0]
 
             logger.info(f"Processing document: {file_name} (type: {file_type})")
@@ -104,26 +242,12 @@ class ChromaDocStore:
             if not file_type:
                 logger.warning(f"Could not determine file type for {file_name}, attempting conversion anyway")
 
-            # Read the file content if it's a FastAPI UploadFile
-            if hasattr(file_obj, 'read'):
-                logger.debug("Reading file content...")
-                if asyncio.iscoroutinefunction(file_obj.read):
-                    file_content = await file_obj.read()
-                else:
-                    file_content = file_obj.read()
-
-                logger.debug(f"Read {len(file_content)} bytes from file")
-
-                # Convert to file-like object
-                file_obj = BytesIO(file_content)
-                file_obj.seek(0)  # Ensure we're at the start of the stream
-                logger.debug("Converted to BytesIO object")
-
             # Handle PDF files separately using pdfminer
             if file_type == 'application/pdf':
                 logger.info("Detected PDF file, using pdfminer to extract text.")
                 try:
-                    page_texts = ChromaDocStore.extract_text_from_pdf(file_obj)  # Now returns a list of texts per page
+                    with open_mapped(path) as mapped_file:
+                        page_texts = ChromaDocStore.extract_text_from_pdf(mapped_file)  # Now returns a list of texts per page
                     if not page_texts or all(not text.strip() for text in page_texts):
                         raise ValueError("pdfminer extracted empty text content")
                     documents = []
@@ -150,7 +274,7 @@ class ChromaDocStore:
             # Convert document to markdown
             logger.debug("Starting document conversion with MarkItDown...")
             try:
-                result = md.convert(file_obj)
+                result = md.convert(str(path))
                 logger.debug("Document conversion completed")
 
 
@@ -163,8 +287,7 @@ class ChromaDocStore:
                 if not result.text_content:
                     raise ValueError("MarkItDown extracted empty text content")
 
-                logger.debug(f"Text content length: {len(result.text_content)}")
-                logger.debug(f"First 100 chars: {result.text_content[:100]}")
+                logger.debug("Text content length: %d", len(result.text_content))
 
             except Exception as conv_error:
                 logger.error(f"MarkItDown conversion error: {str(conv_error)}", exc_info=True)
@@ -187,37 +310,40 @@ class ChromaDocStore:
 
 
     @log_time(logger)
-    def add_documents(self, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str] = None) -> bool:
+    def add_documents(self, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str] = None, collection_name: str = None) -> bool:
         try:
             # Validate input lengths match
             if len(documents) != len(metadatas):
                 raise ValueError(f"Number of documents ({len(documents)}) must match number of metadatas ({len(metadatas)})")
 
-            # Get current collection size for ID generation
-            current_docs = self.collection.get()
-            start_idx = len(current_docs['ids']) if current_docs['ids'] else 0
-            
-            # Generate sequential IDs
-            generated_ids = [f"doc_{i}" for i in range(start_idx, start_idx + len(documents))]
-            
             # Ensure required metadata fields exist
             for metadata in metadatas:
                 if 'file_name' not in metadata:
                     metadata['file_name'] = 'unknown'
                 if 'page_range' not in metadata:
                     metadata['page_range'] = 'unknown'
+
+            # Random IDs stay unique across ingestion workers and backend processes
+            generated_ids = ids or [f"doc_{uuid.uuid4().hex}" for _ in documents]
             
-            logger.info(f"Adding {len(documents)} documents with IDs {generated_ids[0]} to {generated_ids[-1]}")
+            logger.info(f"Adding {len(documents)} documents to {collection_name or self.collection_name}")
             
-            self.collection.add(
+            self.with_collection(collection_name, lambda collection: collection.add(
                 documents=documents,
                 metadatas=metadatas,
                 ids=generated_ids
-            )
+            ), create=True)
             return True
         except Exception as e:
+            # Raised so callers such as ingestion jobs can report the actual cause
             logger.error(f"Error adding documents: {e}")
-            return False
+            raise
+
+    def delete_documents(self, ids: List[str], collection_name: str = None, batch_size: int = 5000):
+        """Delete documents by ID, ignoring IDs that are not in the collection"""
+        for start in range(0, len(ids), batch_size):
+            self.with_collection(collection_name, lambda collection: collection.delete(ids=ids[start:start + batch_size]))
+        logger.info(f"Deleted up to {len(ids)} documents from {collection_name or self.collection_name}")
 
     def get_chunking_config(self):
         return {
@@ -225,11 +351,41 @@ class ChromaDocStore:
             "chunk_overlap": self.chunk_overlap
         }
 
-    def get_all_documents(self):
-        return self.collection.get()
+    def get_all_documents(self, collection_name: str = None):
+        return self.with_collection(collection_name, lambda collection: collection.get())
+
+    @staticmethod
+    def build_where_clause(
+            file_names: Optional[List[str]] = None,
+            file_types: Optional[List[str]] = None,
+            page_ranges: Optional[List[Tuple[int, int]]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Translate retrieval filters into a Chroma `where` clause.
+
+        Args:
+            file_names: Only search chunks from these files
+            file_types: Only search chunks with these MIME types
+            page_ranges: Only search chunks on pages within any of these inclusive (start, end) ranges
+        """
+        conditions = []
+        if file_names:
+            conditions.append({'file_name': {'$in': list(file_names)}})
+        if file_types:
+            conditions.append({'type': {'$in': list(file_types)}})
+        if page_ranges:
+            range_conditions = [
+                {'$and': [{'page_number': {'$gte': int(start)}}, {'page_number': {'$lte': int(end)}}]}
+                for start, end in page_ranges
+            ]
+            conditions.append(range_conditions[0] if len(range_conditions) == 1 else {'$or': range_conditions})
+
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {'$and': conditions}
 
     @log_time(logger)
-    def query_documents(self, query: str, n_results: int = None, distance_threshold: float = None):
+    def query_documents(self, query: str, n_results: int = None, distance_threshold: float = None, where: Dict[str, Any] = None, collection_name: str = None):
         """
         Query documents with a distance threshold to filter out irrelevant results.
         Lower distance means more similar (better match). Range is typically 0-1.
@@ -238,6 +394,8 @@ class ChromaDocStore:
             query (str): The query text to search for
             n_results (int, optional): Number of results to return. Defaults to self.n_results
             distance_threshold (float, optional): Maximum distance threshold for results. Defaults to self.distance_threshold
+            where (dict, optional): Chroma metadata filter applied during the search, see build_where_clause
+            collection_name (str, optional): Collection to search. Defaults to self.collection_name
         """
         if n_results is None:
             n_results = self.n_results
@@ -246,10 +404,11 @@ class ChromaDocStore:
             distance_threshold = self.distance_threshold
             
         logger.info(f"Querying documents with: {query[:100]}...")
-        results = self.collection.query(
+        results = self.with_collection(collection_name, lambda collection: collection.query(
             query_texts=[query],
-            n_results=n_results
-        )
+            n_results=n_results,
+            where=where
+        ))
         
         # Filter out results above the distance threshold if distances are available
         if results['documents'] and results['documents'][0]:
@@ -275,31 +434,72 @@ class ChromaDocStore:
                 if 'distances' in results:
                     results['distances'][0] = [results['distances'][0][i] for i in filtered_indices]
             
-            # Log retrieved chunks and their distances
-            for i in range(len(results['documents'][0])):
-                distance = results['distances'][0][i] if 'distances' in results else 'N/A'
-                metadata = results['metadatas'][0][i]
-                logger.info(f"Retrieved chunk {i + 1}/{len(results['documents'][0])}:")
-                logger.info(f"  Distance: {distance}")
-                logger.info(f"  Metadata: {metadata}")
-                logger.info(f"  Content: {results['documents'][0][i][:50]}...")
+            # Log retrieved chunks and their distances (sampled, off unless LOG_RETRIEVAL_LEVEL=DEBUG)
+            logger.info(f"Retrieved {len(results['documents'][0])} chunks")
+            if retrieval_logger.isEnabledFor(logging.DEBUG) and sample_retrieval_logs():
+                for i in range(len(results['documents'][0])):
+                    retrieval_logger.debug("Retrieved chunk", extra={"fields": {
+                        "rank": i + 1,
+                        "distance": results['distances'][0][i] if 'distances' in results else None,
+                        "metadata": results['metadatas'][0][i],
+                        "content": results['documents'][0][i][:50]
+                    }})
         
         return results
 
     @log_time(logger)
-    def clear_documents(self):
-        logger.info("Clearing all documents and reinitializing collection")
+    def query_documents_batch(self, queries: List[str], n_results: int = None, distance_threshold: float = None, where: Dict[str, Any] = None, collection_name: str = None) -> List[Dict[str, Any]]:
+        """
+        Query documents for several questions at once. All queries are embedded in a
+        single batch and searched with one multi-query call.
+
+        Returns one result per query in the same format as query_documents.
+        """
+        if n_results is None:
+            n_results = self.n_results
+
+        if distance_threshold is None:
+            distance_threshold = self.distance_threshold
+
+        logger.info(f"Batch querying documents with {len(queries)} queries")
+        results = self.with_collection(collection_name, lambda collection: collection.query(
+            query_texts=queries,
+            n_results=n_results,
+            where=where
+        ))
+
+        batch_results = []
+        for q in range(len(queries)):
+            distances = results['distances'][q] if results.get('distances') else []
+            kept = [i for i, dist in enumerate(distances) if dist <= distance_threshold]
+            batch_results.append({
+                'documents': [[results['documents'][q][i] for i in kept]],
+                'metadatas': [[results['metadatas'][q][i] for i in kept]],
+                'distances': [[distances[i] for i in kept]]
+            })
+
+        logger.info(f"Retrieved {sum(len(r['documents'][0]) for r in batch_results)} chunks for {len(queries)} queries")
+        return batch_results
+
+    @log_time(logger)
+    def clear_documents(self, collection_name: str = None):
+        collection_name = collection_name or self.collection_name
+        logger.info(f"Clearing all documents and reinitializing collection {collection_name}")
+        # Keep the HNSW settings of the collection being cleared
+        metadata = self.get_collection(collection_name).metadata or self._hnsw_metadata()
         try:
             # Delete the entire collection
-            self.client.delete_collection(name=self.collection_name)
-            logger.info(f"Deleted collection: {self.collection_name}")
+            self.client.delete_collection(name=collection_name)
+            self.collections.pop(collection_name, None)
+            logger.info(f"Deleted collection: {collection_name}")
             
             # Recreate the collection with the current embedding function
-            self.collection = self.client.create_collection(
-                name=self.collection_name,
-                embedding_function=self.embedding_function
+            self.collections[collection_name] = self.client.create_collection(
+                name=collection_name,
+                embedding_function=self.embedding_function,
+                metadata=metadata
             )
-            logger.info(f"Recreated collection: {self.collection_name}")
+            logger.info(f"Recreated collection: {collection_name}")
             
             return True
         except Exception as e:
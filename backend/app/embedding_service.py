@@ -0,0 +1,45 @@
+import os
+import threading
+import requests
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from .logger_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class RemoteEmbeddingFunction(EmbeddingFunction):
+    """
+    Embedding function backed by a shared embedding server (see embedding_server.py).
+
+    Lets several uvicorn workers use one copy of the embedding model instead of
+    each loading its own. Each thread keeps its own HTTP session, since
+    requests sessions are not thread-safe.
+    """
+
+    def __init__(self, url: str = None, timeout: float = None, expected_model: str = None):
+        self.url = (url or os.getenv('EMBEDDING_SERVICE_URL')).rstrip('/')
+        self.timeout = timeout or float(os.getenv('EMBEDDING_SERVICE_TIMEOUT', 120))
+        self._local = threading.local()
+        self.model_name = self._fetch_model_name()
+        # Embeddings from another model would silently mismatch the stored vectors
+        if expected_model and self.model_name != expected_model:
+            raise ValueError(
+                f"Embedding service at {self.url} serves {self.model_name}, but {expected_model} is configured"
+            )
+        logger.info(f"Initialized RemoteEmbeddingFunction with URL: {self.url}, model: {self.model_name}")
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _fetch_model_name(self) -> str:
+        response = self._session().get(f"{self.url}/info", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["model"]
+
+    def __call__(self, input: Documents) -> Embeddings:
+        response = self._session().post(f"{self.url}/embed", json={"texts": list(input)}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["embeddings"]
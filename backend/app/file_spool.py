@@ -0,0 +1,75 @@
+import asyncio
+import hashlib
+import mmap
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from .logger_config import get_logger
+
+logger = get_logger(__name__)
+
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+def get_max_upload_size() -> int:
+    """Maximum size of a single uploaded file in bytes"""
+    return int(float(os.getenv('MAX_UPLOAD_SIZE_MB', 200)) * 1024 * 1024)
+
+
+def get_max_upload_request_size() -> int:
+    """Maximum size of a whole upload request in bytes, checked before its body is received"""
+    return int(float(os.getenv('MAX_UPLOAD_REQUEST_SIZE_MB', 1000)) * 1024 * 1024)
+
+
+async def spool_upload(file_obj, dest_path: Path, max_size: int = None):
+    """
+    Stream an uploaded file to disk in fixed-size chunks, hashing it on the fly.
+
+    Returns a tuple of (size in bytes, sha256 hex digest).
+    """
+    if max_size is None:
+        max_size = get_max_upload_size()
+
+    file_name = getattr(file_obj, 'filename', None) or getattr(file_obj, 'name', 'unknown')
+    sha256 = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(dest_path, 'wb') as out:
+            while True:
+                if asyncio.iscoroutinefunction(file_obj.read):
+                    chunk = await file_obj.read(SPOOL_CHUNK_SIZE)
+                else:
+                    chunk = file_obj.read(SPOOL_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError(
+                        f"File {file_name} exceeds the maximum upload size of {max_size // (1024 * 1024)} MB"
+                    )
+                sha256.update(chunk)
+                out.write(chunk)
+    except Exception:
+        Path(dest_path).unlink(missing_ok=True)
+        raise
+
+    logger.debug("Spooled %d bytes of %s to %s", size, file_name, dest_path)
+    return size, sha256.hexdigest()
+
+
+@contextmanager
+def open_mapped(path):
+    """Open a spooled file as a read-only memory map usable as a binary file object"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"File {Path(path).name} is empty")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
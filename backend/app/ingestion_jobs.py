@@ -0,0 +1,300 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import List, Dict, Any
+from .logger_config import get_logger, request_id_var
+from .file_spool import spool_upload
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where only a single backend process is supported
+    fcntl = None
+
+logger = get_logger(__name__)
+
+
+def build_chunks(document_store, documents: List[Dict[str, Any]]):
+    """Split extracted documents into chunks and build their metadata"""
+    processed_docs = []
+    processed_metas = []
+
+    for doc in documents:
+        chunks = document_store.text_splitter.split_text(doc['text'])
+        # Calculate page range for each chunk
+        for j, chunk in enumerate(chunks):
+            processed_docs.append(chunk)
+            # Ensure all metadata fields have valid values
+            metadata = {
+                'source': str(doc.get('file_name', 'unknown')),
+                'type': doc.get('file_type', 'unknown'),  # Use file_type from document
+                'file_name': str(doc.get('file_name', 'unknown')),
+                'page_number': int(doc.get('page_number', 0)),  # Numeric so page ranges can be filtered
+                'page_range': f"{doc.get('page_number', 'unknown')}",
+                'chunk_num': j + 1,
+                'total_chunks': len(chunks)
+            }
+            processed_metas.append(metadata)
+
+    return processed_docs, processed_metas
+
+
+class IngestionJobManager:
+    """
+    Runs document ingestion in the background.
+
+    Uploaded files are spooled to the job directory, the job is queued and a
+    bounded pool of workers extracts, splits and embeds the files. Job state
+    is persisted as JSON so it survives restarts.
+
+    When several backend processes share the jobs directory, each job is
+    claimed with an exclusive file lock by the process that runs it, and the
+    status of jobs owned by other processes is read from disk.
+    """
+
+    def __init__(self, document_store, jobs_dir: str = None, max_workers: int = None, batch_size: int = None):
+        self.document_store = document_store
+        self.jobs_dir = Path(jobs_dir or os.getenv('INGEST_JOBS_DIR', './jobs'))
+        self.max_workers = max_workers or int(os.getenv('INGEST_MAX_WORKERS', 2))
+        self.batch_size = batch_size or int(os.getenv('INGEST_BATCH_SIZE', 256))
+        # Jobs claimed by this process, other jobs are read from disk
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.claims: Dict[str, int] = {}
+        self.queue = None
+        self.workers = []
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Initialized IngestionJobManager with jobs_dir={self.jobs_dir}, max_workers={self.max_workers}")
+
+    def _job_dir(self, job_id: str) -> Path:
+        return self.jobs_dir / job_id
+
+    def _claim(self, job_id: str) -> bool:
+        """Take the job's lock, which the OS releases if this process dies"""
+        if fcntl is None:
+            return True
+        fd = os.open(self._job_dir(job_id) / 'lock', os.O_CREAT | os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self.claims[job_id] = fd
+        return True
+
+    def _release(self, job_id: str):
+        fd = self.claims.pop(job_id, None)
+        if fd is not None:
+            os.close(fd)
+
+    def _read_job(self, job_id: str):
+        state_path = self._job_dir(job_id) / 'job.json'
+        if not state_path.exists():
+            return None
+        return json.loads(state_path.read_text())
+
+    def _persist(self, job: Dict[str, Any]):
+        state_path = self._job_dir(job['id']) / 'job.json'
+        tmp_path = state_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(job))
+        os.replace(tmp_path, state_path)
+
+    @staticmethod
+    def _chunk_ids(file_state: Dict[str, Any]) -> List[str]:
+        """IDs of a file's chunks, derived from its job and position so they can be deleted after a failure or restart"""
+        return [f"doc_{file_state['chunk_id_prefix']}_{n}" for n in range(file_state['chunks_total'])]
+
+    def _discard_chunks(self, job: Dict[str, Any], file_state: Dict[str, Any]):
+        """Remove the chunks of a failed file that were already added, so a re-upload does not duplicate them"""
+        # The last batch may have been added without being recorded, so all of the file's IDs are deleted
+        if not file_state['chunks_total'] or 'chunk_id_prefix' not in file_state:
+            return
+        try:
+            self.document_store.delete_documents(
+                self._chunk_ids(file_state), collection_name=job['collection'], batch_size=self.batch_size
+            )
+            file_state['chunks_embedded'] = 0
+        except Exception as e:
+            logger.error(f"Could not remove partially ingested chunks of {file_state['file_name']}: {e}")
+
+    def _load_jobs(self):
+        for state_path in self.jobs_dir.glob('*/job.json'):
+            try:
+                job = json.loads(state_path.read_text())
+            except Exception as e:
+                logger.error(f"Could not load job state from {state_path}: {e}")
+                continue
+            if job['status'] not in ('queued', 'running') or not self._claim(job['id']):
+                # Finished, or owned by another live backend process
+                continue
+            if job['status'] == 'running':
+                # Partially ingested files cannot be resumed safely
+                job['status'] = 'failed'
+                job['errors'].append("Job interrupted by server restart")
+                for file_state in job['files']:
+                    if file_state['status'] != 'done':
+                        self._discard_chunks(job, file_state)
+                        file_state['status'] = 'failed'
+                        file_state['error'] = "Job interrupted by server restart"
+                job['finished_at'] = time.time()
+                self._persist(job)
+                shutil.rmtree(self._job_dir(job['id']) / 'files', ignore_errors=True)
+                self._release(job['id'])
+                continue
+            self.jobs[job['id']] = job
+            self.queue.put_nowait(job['id'])
+        logger.info(f"Resumed {len(self.jobs)} queued ingestion jobs")
+
+    async def start(self):
+        """Load persisted jobs and start the worker pool"""
+        self.queue = asyncio.Queue()
+        self._load_jobs()
+        self.workers = [asyncio.create_task(self._worker(i)) for i in range(self.max_workers)]
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    async def submit(self, files, collection_name: str = None) -> str:
+        """Spool uploaded files to a new job directory and queue the job"""
+        job_id = uuid.uuid4().hex
+        files_dir = self._job_dir(job_id) / 'files'
+        files_dir.mkdir(parents=True)
+        self._claim(job_id)
+
+        file_states = []
+        try:
+            for index, file in enumerate(files):
+                stored_path = files_dir / f"{index}_{Path(file.filename).name}"
+                size, sha256 = await spool_upload(file, stored_path)
+                file_states.append({
+                    'file_name': file.filename,
+                    'stored_path': str(stored_path),
+                    'chunk_id_prefix': f"{job_id}_{index}",
+                    'size': size,
+                    'sha256': sha256,
+                    'status': 'pending',
+                    'pages': 0,
+                    'chunks_total': 0,
+                    'chunks_embedded': 0,
+                    'error': None
+                })
+        except Exception:
+            self._release(job_id)
+            shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+            raise
+
+        job = {
+            'id': job_id,
+            'request_id': request_id_var.get(),
+            'collection': collection_name or self.document_store.collection_name,
+            'status': 'queued',
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'files': file_states,
+            'chunks_embedded': 0,
+            'chunks_per_second': 0.0,
+            'errors': []
+        }
+        self.jobs[job_id] = job
+        self._persist(job)
+        await self.queue.put(job_id)
+        logger.info(f"Queued ingestion job {job_id} with {len(file_states)} files")
+        return job_id
+
+    def get_job(self, job_id: str):
+        if job_id in self.jobs:
+            return self.jobs[job_id]
+        return self._read_job(Path(job_id).name)
+
+    def list_jobs(self):
+        jobs = {}
+        for state_path in self.jobs_dir.glob('*/job.json'):
+            try:
+                job = json.loads(state_path.read_text())
+            except Exception:
+                continue
+            jobs[job['id']] = job
+        jobs.update(self.jobs)
+        return sorted(jobs.values(), key=lambda job: job['created_at'], reverse=True)
+
+    async def _worker(self, worker_num: int):
+        while True:
+            job_id = await self.queue.get()
+            # Keep logging the job under the ID of the request that submitted it
+            token = request_id_var.set(self.jobs[job_id].get('request_id', '-'))
+            try:
+                await self._run_job(self.jobs[job_id])
+            except Exception as e:
+                logger.error(f"Ingestion job {job_id} failed: {e}", exc_info=True)
+                job = self.jobs[job_id]
+                job['status'] = 'failed'
+                job['errors'].append(str(e))
+                job['finished_at'] = time.time()
+                self._persist(job)
+            finally:
+                # Finished jobs are served from disk from now on
+                self.jobs.pop(job_id, None)
+                self._release(job_id)
+                request_id_var.reset(token)
+                self.queue.task_done()
+
+    async def _run_job(self, job: Dict[str, Any]):
+        logger.info(f"Starting ingestion job {job['id']}")
+        job['status'] = 'running'
+        job['started_at'] = time.time()
+        self._persist(job)
+
+        for file_state in job['files']:
+            try:
+                await self._ingest_file(job, file_state)
+                file_state['status'] = 'done'
+            except Exception as e:
+                error_msg = f"Error processing {file_state['file_name']}: {str(e)}"
+                logger.error(error_msg)
+                file_state['status'] = 'failed'
+                file_state['error'] = error_msg
+                job['errors'].append(error_msg)
+                await asyncio.to_thread(self._discard_chunks, job, file_state)
+            self._persist(job)
+
+        failed = all(file_state['status'] == 'failed' for file_state in job['files'])
+        job['status'] = 'failed' if failed else 'completed'
+        job['finished_at'] = time.time()
+        self._persist(job)
+        shutil.rmtree(self._job_dir(job['id']) / 'files', ignore_errors=True)
+        logger.info(f"Finished ingestion job {job['id']} with status {job['status']}, {job['chunks_embedded']} chunks embedded")
+
+    async def _ingest_file(self, job: Dict[str, Any], file_state: Dict[str, Any]):
+        file_state['status'] = 'extracting'
+        self._persist(job)
+
+        documents = await asyncio.to_thread(
+            self.document_store.extract_text_from_file, file_state['stored_path'], file_state['file_name']
+        )
+        if not documents:
+            raise ValueError(f"No documents extracted from {file_state['file_name']}")
+
+        processed_docs, processed_metas = build_chunks(self.document_store, documents)
+        file_state['pages'] = len(documents)
+        file_state['chunks_total'] = len(processed_docs)
+        file_state['status'] = 'embedding'
+        self._persist(job)
+
+        chunk_ids = self._chunk_ids(file_state)
+        for start in range(0, len(processed_docs), self.batch_size):
+            end = start + self.batch_size
+            await asyncio.to_thread(
+                self.document_store.add_documents, processed_docs[start:end], processed_metas[start:end],
+                ids=chunk_ids[start:end], collection_name=job['collection']
+            )
+            added = len(processed_docs[start:end])
+            file_state['chunks_embedded'] += added
+            job['chunks_embedded'] += added
+            job['chunks_per_second'] = job['chunks_embedded'] / max(time.time() - job['started_at'], 1e-6)
+            self._persist(job)
@@ -1,17 +1,138 @@
 import logging
+import logging.handlers
 import time
 from functools import wraps
 import asyncio
+import atexit
+import contextvars
+import copy
+import json
+import os
+import queue
+import random
+import uuid
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load the root .env before reading the logging configuration, this module is imported first
+load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / '.env')
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+
+# Request ID of the request currently being served (set by the HTTP middleware in main.py)
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+# Dedicated logger for per-chunk retrieval details, so it can be tuned independently
+RETRIEVAL_LOGGER_NAME = "app.retrieval"
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request ID to every record before it leaves the calling thread"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    """Plain text format with structured fields appended as key=value pairs"""
+
+    def format(self, record):
+        message = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            message += " | " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects"""
+
+    def format(self, record):
+        payload = {
+            "timestamp": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            payload.update(fields)
+        if record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that keeps the traceback separate from the message.
+
+    The stock QueueHandler folds the traceback into the message, so formatters
+    on the listener side could not report it as its own field.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def configure_logging():
+    """
+    Route all logging through a non-blocking queue handler.
+
+    Records are only enqueued on the request path; formatting and writing to
+    stderr happen on a background listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level = os.getenv('LOG_LEVEL', 'INFO').upper()
+    if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = TextFormatter(LOG_FORMAT)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+
+    logging.getLogger(RETRIEVAL_LOGGER_NAME).setLevel(os.getenv('LOG_RETRIEVAL_LEVEL', 'INFO').upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 
 def get_logger(name):
     return logging.getLogger(name)
 
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+def sample_retrieval_logs() -> bool:
+    """Decide whether detailed retrieval logs should be emitted for the current query"""
+    rate = float(os.getenv('LOG_RETRIEVAL_SAMPLE_RATE', 1.0))
+    return rate >= 1.0 or random.random() < rate
+
 def log_time(logger):
     def decorator(func):
         @wraps(func)
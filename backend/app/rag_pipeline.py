@@ -1,4 +1,6 @@
 import os
+import asyncio
+import time
 from typing import AsyncGenerator, List
 from app.ollama_integration import OllamaAPI
 from pathlib import Path
@@ -17,26 +19,16 @@ def format_citation(metadata: dict) -> str:
     page_range = metadata.get('page_range', 'unknown')
     return f"[{file_name}, pages: {page_range}]"
 
-async def rag_pipeline(document_store, query: str, messages: List[dict] = None, previous_chunks: List[str] = None, model: str = None) -> AsyncGenerator[str, None]:
+def build_prompt(query: str, results: dict, messages: List[dict] = None, previous_chunks: List[str] = None) -> List[dict]:
     """
-    Async RAG pipeline with proper streaming
+    Build the chat prompt for a query from its retrieval results
     
     Args:
-        document_store: The document store instance
         query: The user's question
+        results: Retrieval results in the format returned by query_documents
         messages: Optional list of previous chat messages
         previous_chunks: Optional list of previous context chunks
-        model: Optional model name to use for generation
     """
-    # Get new relevant chunks with distance threshold
-    distance_threshold = float(os.getenv("DISTANCE_THRESHOLD", 0.6))
-    n_results = int(os.getenv("N_RESULTS", 5))
-    results = document_store.query_documents(
-        query=query,
-        n_results=n_results, 
-        distance_threshold=distance_threshold
-    )
-    
     # Format chunks with citations
     current_chunks = []
     if results['documents'] and results['documents'][0]:
@@ -85,6 +77,29 @@ async def rag_pipeline(document_store, query: str, messages: List[dict] = None,
         "role": "user",
         "content": query
     })
+    return prompt
+
+async def rag_pipeline(document_store, query: str, messages: List[dict] = None, previous_chunks: List[str] = None, model: str = None, where: dict = None, collection_name: str = None) -> AsyncGenerator[str, None]:
+    """
+    Async RAG pipeline with proper streaming
+    
+    Args:
+        document_store: The document store instance
+        query: The user's question
+        messages: Optional list of previous chat messages
+        previous_chunks: Optional list of previous context chunks
+        model: Optional model name to use for generation
+        where: Optional Chroma metadata filter restricting which chunks are searched
+        collection_name: Optional collection to search instead of the default one
+    """
+    # Get new relevant chunks, using the store's configured N_RESULTS and DISTANCE_THRESHOLD
+    results = document_store.query_documents(
+        query=query,
+        where=where,
+        collection_name=collection_name
+    )
+
+    prompt = build_prompt(query, results, messages, previous_chunks)
 
     ollama_api = OllamaAPI()
     # Use provided model or fall back to environment variable
@@ -92,3 +107,71 @@ async def rag_pipeline(document_store, query: str, messages: List[dict] = None,
 
     async for token in ollama_api.chat(prompt, model=model_to_use):
         yield token
+
+async def batch_rag_pipeline(document_store, questions: List[str], model: str = None, where: dict = None, max_concurrency: int = None, collection_name: str = None) -> AsyncGenerator[dict, None]:
+    """
+    Answer many independent questions, yielding one result per question as it completes
+    
+    All questions are retrieved with a single batched query, then answers are
+    generated concurrently with at most max_concurrency requests to Ollama.
+    
+    Args:
+        document_store: The document store instance
+        questions: The questions to answer
+        model: Optional model name to use for generation
+        where: Optional Chroma metadata filter restricting which chunks are searched
+        max_concurrency: Optional limit of concurrent generations, capped by BATCH_MAX_CONCURRENCY
+        collection_name: Optional collection to search instead of the default one
+    """
+    limit = int(os.getenv("BATCH_MAX_CONCURRENCY", 4))
+    max_concurrency = min(max_concurrency or limit, limit)
+
+    retrieval_start = time.perf_counter()
+    batch_results = await asyncio.to_thread(
+        document_store.query_documents_batch,
+        questions,
+        where=where,
+        collection_name=collection_name
+    )
+    retrieval_seconds = time.perf_counter() - retrieval_start
+
+    ollama_api = OllamaAPI()
+    model_to_use = model or os.getenv("OLLAMA_MODEL", "")
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def answer(index: int, question: str, results: dict) -> dict:
+        async with semaphore:
+            start = time.perf_counter()
+            first_token_seconds = None
+            tokens = []
+            error = None
+            try:
+                async for token in ollama_api.chat(build_prompt(question, results), model=model_to_use):
+                    if first_token_seconds is None:
+                        first_token_seconds = time.perf_counter() - start
+                    tokens.append(token)
+            except Exception as e:
+                error = str(e)
+            return {
+                "index": index,
+                "question": question,
+                "answer": "".join(tokens),
+                "sources": [format_citation(metadata) for metadata in results['metadatas'][0]],
+                "error": error,
+                "timings": {
+                    "retrieval_batch_seconds": retrieval_seconds,
+                    "time_to_first_token_seconds": first_token_seconds,
+                    "generation_seconds": time.perf_counter() - start
+                }
+            }
+
+    tasks = [
+        asyncio.create_task(answer(i, question, results))
+        for i, (question, results) in enumerate(zip(questions, batch_results))
+    ]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            yield await completed
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,180 @@
+import gzip
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+import numpy as np
+from .logger_config import get_logger, log_time
+
+logger = get_logger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+EMBEDDINGS_FILE = 'embeddings.npy'
+RECORDS_FILE = 'records.jsonl.gz'
+SNAPSHOT_VERSION = 2
+
+
+def get_snapshot_dir() -> Path:
+    return Path(os.getenv('SNAPSHOT_DIR', './snapshots'))
+
+
+def list_snapshots() -> list:
+    """Return the manifests of all snapshots in the snapshot directory"""
+    snapshots = []
+    for manifest_path in sorted(get_snapshot_dir().glob(f'*/{MANIFEST_FILE}')):
+        manifest = json.loads(manifest_path.read_text())
+        manifest['name'] = manifest_path.parent.name
+        snapshots.append(manifest)
+    return snapshots
+
+
+def _batch_size(document_store) -> int:
+    batch_size = int(os.getenv('SNAPSHOT_BATCH_SIZE', 5000))
+    # Chroma limits how many records a single add may contain
+    max_batch_size = getattr(document_store.client, 'max_batch_size', None)
+    return min(batch_size, max_batch_size) if max_batch_size else batch_size
+
+
+@log_time(logger)
+def export_snapshot(document_store, path: Path, collection_name: str = None, dtype: str = 'float32') -> dict:
+    """
+    Export a collection to a snapshot directory without re-embedding anything.
+
+    The snapshot contains the embeddings as a NumPy array, the ids, texts and
+    metadatas as gzipped JSON lines and a manifest with the index settings.
+    Both are written batch by batch, so memory use does not grow with the collection.
+    """
+    if dtype not in ('float32', 'float16'):
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+
+    count = document_store.with_collection(collection_name, lambda collection: collection.count())
+    # Refreshed by the count above if the cached handle was stale
+    collection = document_store.get_collection(collection_name)
+    if count == 0:
+        raise ValueError(f"Collection {collection.name} is empty")
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=False)
+    try:
+        batch_size = _batch_size(document_store)
+
+        embeddings = None
+        offset = 0
+        with gzip.open(path / RECORDS_FILE, 'wt', encoding='utf-8') as records:
+            while offset < count:
+                batch = collection.get(
+                    include=['embeddings', 'documents', 'metadatas'],
+                    limit=batch_size,
+                    offset=offset
+                )
+                if not batch['ids']:
+                    break
+                batch_embeddings = np.asarray(batch['embeddings'], dtype=dtype)
+                if embeddings is None:
+                    # Written straight to disk so the whole matrix is never held in memory
+                    embeddings = np.lib.format.open_memmap(
+                        path / EMBEDDINGS_FILE, mode='w+', dtype=dtype, shape=(count, batch_embeddings.shape[1])
+                    )
+                embeddings[offset:offset + len(batch['ids'])] = batch_embeddings
+                for record_id, document, metadata in zip(batch['ids'], batch['documents'], batch['metadatas']):
+                    records.write(json.dumps({'id': record_id, 'document': document, 'metadata': metadata}) + '\n')
+                offset += len(batch['ids'])
+                logger.info(f"Exported {offset}/{count} records from {collection.name}")
+
+        if embeddings is None:
+            raise ValueError(f"No records could be read from {collection.name}")
+        embeddings.flush()
+        del embeddings
+
+        manifest = {
+            'version': SNAPSHOT_VERSION,
+            'collection': collection.name,
+            'collection_metadata': collection.metadata or {},
+            'count': offset,
+            'dtype': dtype,
+            'embedding_model': document_store.embedding_model_name,
+            'created_at': time.time()
+        }
+        (path / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    except Exception:
+        # Do not leave a partial snapshot behind, so the export can be retried under the same name
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+
+    logger.info(f"Exported {offset} records from {collection.name} to {path}")
+    return manifest
+
+
+@log_time(logger)
+def import_snapshot(document_store, path: Path, collection_name: str = None, replace: bool = False) -> dict:
+    """
+    Bulk-load a snapshot into a collection using the stored embeddings.
+
+    The target collection defaults to the one the snapshot was taken from. An
+    existing target must be empty and use the snapshot's distance metric, unless
+    replace is set, in which case it is recreated with the snapshot's index settings.
+    """
+    path = Path(path)
+    manifest = json.loads((path / MANIFEST_FILE).read_text())
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {manifest.get('version')}")
+    if manifest['embedding_model'] != document_store.embedding_model_name:
+        raise ValueError(
+            f"Snapshot was embedded with {manifest['embedding_model']}, "
+            f"but the store uses {document_store.embedding_model_name}"
+        )
+
+    collection_name = collection_name or manifest['collection']
+    hnsw = manifest['collection_metadata']
+    existing = {c['name']: c for c in document_store.list_collections()}
+    if collection_name in existing:
+        target = existing[collection_name]
+        if replace:
+            document_store.delete_collection(collection_name)
+        elif target['count']:
+            raise ValueError(f"Collection {collection_name} is not empty, use replace to overwrite it")
+        elif target['metadata'].get('hnsw:space', 'l2') != hnsw.get('hnsw:space', 'l2'):
+            # Distances, and with them DISTANCE_THRESHOLD, would mean something else in another metric
+            raise ValueError(
+                f"Collection {collection_name} uses the {target['metadata'].get('hnsw:space', 'l2')} space, "
+                f"but the snapshot was taken with {hnsw.get('hnsw:space', 'l2')}, use replace to recreate it"
+            )
+    if replace or collection_name not in existing:
+        document_store.create_collection(
+            collection_name,
+            space=hnsw.get('hnsw:space'),
+            m=hnsw.get('hnsw:M'),
+            construction_ef=hnsw.get('hnsw:construction_ef'),
+            search_ef=hnsw.get('hnsw:search_ef')
+        )
+
+    embeddings = np.load(path / EMBEDDINGS_FILE, mmap_mode='r')
+    batch_size = _batch_size(document_store)
+    count = manifest['count']
+    imported = 0
+
+    def add_batch(batch: list, start: int):
+        document_store.with_collection(collection_name, lambda collection: collection.add(
+            ids=[record['id'] for record in batch],
+            embeddings=np.asarray(embeddings[start:start + len(batch)], dtype=np.float32).tolist(),
+            documents=[record['document'] for record in batch],
+            metadatas=[record['metadata'] for record in batch]
+        ))
+
+    # Records are streamed back in batches, so the corpus is never loaded at once
+    with gzip.open(path / RECORDS_FILE, 'rt', encoding='utf-8') as records:
+        batch = []
+        for line in records:
+            batch.append(json.loads(line))
+            if len(batch) == batch_size:
+                add_batch(batch, imported)
+                imported += len(batch)
+                batch = []
+                logger.info(f"Imported {imported}/{count} records into {collection_name}")
+        if batch:
+            add_batch(batch, imported)
+            imported += len(batch)
+            logger.info(f"Imported {imported}/{count} records into {collection_name}")
+
+    return {'collection': collection_name, 'count': imported}
@@ -0,0 +1,83 @@
+"""
+Run a file of questions through the backend's /query/batch endpoint.
+
+Questions are read one per line (or as JSON lines with a "question" field) and
+sent in requests of at most BATCH_MAX_QUESTIONS questions. The NDJSON results
+are written to stdout or to the given output file.
+
+Usage:
+    python batch_query.py questions.txt -o results.ndjson --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import aiohttp
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load the environment variables from the root .env file
+load_dotenv(dotenv_path=Path(__file__).resolve().parents[1] / '.env')
+
+
+def read_questions(path: str) -> list[str]:
+    questions = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                line = json.loads(line)['question']
+            questions.append(line)
+    return questions
+
+
+async def run(args):
+    questions = read_questions(args.questions)
+    batch_size = int(os.getenv('BATCH_MAX_QUESTIONS', 100))
+    payload = {}
+    if args.model:
+        payload["model"] = args.model
+    if args.concurrency:
+        payload["max_concurrency"] = args.concurrency
+    if args.file_names:
+        payload["filters"] = {"file_names": args.file_names}
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    answered = 0
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None)) as session:
+            for start in range(0, len(questions), batch_size):
+                payload["questions"] = questions[start:start + batch_size]
+                async with session.post(f"{args.backend_url}/query/batch", json=payload) as response:
+                    response.raise_for_status()
+                    async for line in response.content:
+                        if line.strip():
+                            result = json.loads(line)
+                            # Indices are relative to each request, make them refer to the questions file
+                            if 'index' in result:
+                                result['index'] += start
+                            out.write(json.dumps(result) + "\n")
+                            out.flush()
+                            answered += 1
+                            print(f"Answered {answered}/{len(questions)}", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions with the RAG backend")
+    parser.add_argument("questions", help="File with one question per line, or JSON lines with a 'question' field")
+    parser.add_argument("-o", "--output", help="Write NDJSON results to this file instead of stdout")
+    parser.add_argument("--backend-url", default=os.getenv('BACKEND_URL', 'http://localhost:8000'))
+    parser.add_argument("--model", help="Model to use instead of OLLAMA_MODEL")
+    parser.add_argument("--concurrency", type=int, help="Maximum concurrent generations")
+    parser.add_argument("--file-names", nargs="*", help="Only retrieve chunks from these files")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
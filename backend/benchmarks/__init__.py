@@ -0,0 +1 @@
+# Benchmark harness for ingestion and query performance
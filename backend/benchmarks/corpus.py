@@ -0,0 +1,113 @@
+"""
+Synthetic corpus generator for benchmarks.
+
+Produces reproducible PDF and markdown documents filled with pseudo-random
+technical text, so ingestion and retrieval can be measured without real data.
+"""
+import random
+from pathlib import Path
+
+WORDS = (
+    "system configuration network interface server client request response "
+    "module parameter value error message timeout connection protocol service "
+    "database index query document page chapter section table figure device "
+    "install update restart monitor backup restore user account permission "
+    "memory storage processor cache thread process signal port address route"
+).split()
+
+
+def make_sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 18))]
+    return " ".join(words).capitalize() + "."
+
+
+def make_paragraph(rng: random.Random) -> str:
+    return " ".join(make_sentence(rng) for _ in range(rng.randint(3, 7)))
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, pages: list):
+    """Write a minimal text-only PDF, one list of lines per page"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages object, filled in once the page objects are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for lines in pages:
+        content = ["BT", "/F1 10 Tf", "12 TL", "50 780 Td"]
+        for line in lines:
+            content.append(f"({_pdf_escape(line)}) Tj T*")
+        content.append("ET")
+        stream = "\n".join(content).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_refs))
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref_offset = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        data += b"%010d 00000 n \n" % offset
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    path.write_bytes(bytes(data))
+
+
+def _wrap(text: str, width: int = 95) -> list:
+    lines, current = [], ""
+    for word in text.split():
+        if current and len(current) + len(word) + 1 > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}".strip()
+    if current:
+        lines.append(current)
+    return lines
+
+
+def generate_corpus(output_dir: Path, num_pdfs: int = 5, num_markdown: int = 5, pages_per_pdf: int = 10, seed: int = 42) -> list:
+    """Generate the corpus and return the paths of all created files"""
+    rng = random.Random(seed)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+
+    for i in range(num_pdfs):
+        pages = []
+        for _ in range(pages_per_pdf):
+            lines = []
+            while len(lines) < 55:
+                lines.extend(_wrap(make_paragraph(rng)) + [""])
+            pages.append(lines[:60])
+        path = output_dir / f"manual_{i:03d}.pdf"
+        write_pdf(path, pages)
+        paths.append(path)
+
+    for i in range(num_markdown):
+        sections = []
+        for s in range(rng.randint(5, 10)):
+            paragraphs = "\n\n".join(make_paragraph(rng) for _ in range(rng.randint(2, 5)))
+            sections.append(f"## Section {s + 1}\n\n{paragraphs}")
+        path = output_dir / f"guide_{i:03d}.md"
+        path.write_text(f"# Guide {i}\n\n" + "\n\n".join(sections), encoding="utf-8")
+        paths.append(path)
+
+    return paths
+
+
+def generate_questions(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [f"How do I {rng.choice(WORDS)} the {rng.choice(WORDS)} {rng.choice(WORDS)}?" for _ in range(count)]
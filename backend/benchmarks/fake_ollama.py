@@ -0,0 +1,57 @@
+"""
+Local stand-in for the Ollama API used by benchmarks.
+
+Serves /api/chat with streamed NDJSON tokens at a configurable rate, so query
+latency can be measured without a GPU model.
+
+Usage:
+    python -m benchmarks.fake_ollama --port 11555 --tokens-per-second 50
+"""
+import argparse
+import asyncio
+import json
+from aiohttp import web
+
+
+def create_app(tokens_per_second: float = 50.0, response_tokens: int = 100, first_token_delay: float = 0.1) -> web.Application:
+    async def chat(request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        model = payload.get("model", "fake")
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+
+        await asyncio.sleep(first_token_delay)
+        for i in range(response_tokens):
+            chunk = {"model": model, "message": {"role": "assistant", "content": f"token{i} "}, "done": False}
+            await response.write(json.dumps(chunk).encode() + b"\n")
+            await asyncio.sleep(1.0 / tokens_per_second)
+        await response.write(json.dumps({"model": model, "done": True}).encode() + b"\n")
+        await response.write_eof()
+        return response
+
+    async def tags(request: web.Request) -> web.Response:
+        return web.json_response({"models": [{"name": "fake"}]})
+
+    app = web.Application()
+    app.router.add_post("/api/chat", chat)
+    app.router.add_get("/api/tags", tags)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama /api/chat server")
+    parser.add_argument("--port", type=int, default=11555)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--response-tokens", type=int, default=100)
+    parser.add_argument("--first-token-delay", type=float, default=0.1)
+    args = parser.parse_args()
+    web.run_app(
+        create_app(args.tokens_per_second, args.response_tokens, args.first_token_delay),
+        host="127.0.0.1",
+        port=args.port,
+        print=None  # Keep the benchmark output clean when run as a subprocess
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Ingestion and query benchmark for the RAG backend.
+
+Generates a synthetic corpus, ingests it into an in-memory ChromaDocStore and
+runs queries through rag_pipeline against a local fake Ollama server. Results
+are printed and saved as JSON so runs can be compared across commits.
+
+Usage (from the backend directory):
+    python -m benchmarks.run_benchmark --pdfs 10 --pages 20 --queries 100 --concurrency 4
+    python -m benchmarks.run_benchmark --compare benchmarks/results/<previous>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from .corpus import generate_corpus, generate_questions
+
+
+def percentile(values: list, pct: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values: list) -> dict:
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": sum(values) / len(values) if values else None
+    }
+
+
+def memory_peak_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def benchmark_ingestion(store, paths: list, batch_size: int) -> dict:
+    from app.ingestion_jobs import build_chunks
+
+    pages = 0
+    chunks = 0
+    extraction_seconds = 0.0
+    embedding_seconds = 0.0
+
+    for path in paths:
+        start = time.perf_counter()
+        documents = store.extract_text_from_file(path, path.name)
+        processed_docs, processed_metas = build_chunks(store, documents)
+        extraction_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for offset in range(0, len(processed_docs), batch_size):
+            store.add_documents(processed_docs[offset:offset + batch_size], processed_metas[offset:offset + batch_size])
+        embedding_seconds += time.perf_counter() - start
+
+        pages += len(documents)
+        chunks += len(processed_docs)
+
+    total_seconds = extraction_seconds + embedding_seconds
+    return {
+        "files": len(paths),
+        "pages": pages,
+        "chunks": chunks,
+        "extraction_seconds": extraction_seconds,
+        "embedding_seconds": embedding_seconds,
+        "pages_per_second": pages / total_seconds if total_seconds else None,
+        "chunks_per_second": chunks / total_seconds if total_seconds else None
+    }
+
+
+async def benchmark_queries(store, questions: list, concurrency: int) -> dict:
+    from app.rag_pipeline import rag_pipeline
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    first_token_latencies = []
+    errors = 0
+
+    async def run_query(question: str):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            first_token = None
+            try:
+                async for _ in rag_pipeline(store, question):
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            if first_token is not None:
+                first_token_latencies.append(first_token)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_query(question) for question in questions))
+    wall_seconds = time.perf_counter() - start
+
+    return {
+        "queries": len(questions),
+        "concurrency": concurrency,
+        "errors": errors,
+        "wall_seconds": wall_seconds,
+        "queries_per_second": len(latencies) / wall_seconds if wall_seconds else None,
+        "latency_seconds": summarize(latencies),
+        "time_to_first_token_seconds": summarize(first_token_latencies)
+    }
+
+
+def compare(current: dict, previous: dict):
+    """Print relative changes of the headline metrics against a previous run"""
+    metrics = [
+        ("ingestion", "pages_per_second"),
+        ("ingestion", "chunks_per_second"),
+        ("query", "latency_seconds", "p50"),
+        ("query", "latency_seconds", "p95"),
+        ("query", "latency_seconds", "p99"),
+        ("query", "time_to_first_token_seconds", "p50"),
+        ("memory_peak_mb",)
+    ]
+    print(f"Comparison with {previous.get('git_commit')} ({previous.get('timestamp')}):")
+    for path in metrics:
+        old, new = previous, current
+        for key in path:
+            old = old.get(key) if isinstance(old, dict) else None
+            new = new.get(key) if isinstance(new, dict) else None
+        if old and new is not None:
+            print(f"  {'.'.join(path)}: {old:.4f} -> {new:.4f} ({(new - old) / old * 100:+.1f}%)")
+
+
+@contextmanager
+def fake_ollama_process(args, timeout: float = 30.0):
+    """
+    Run the fake Ollama server in its own process.
+
+    Sharing the event loop with the measured queries would let the blocking
+    retrieval calls stall its token pacing.
+    """
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_ollama",
+        "--port", str(args.ollama_port),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--response-tokens", str(args.response_tokens),
+        "--first-token-delay", str(args.first_token_delay)
+    ], cwd=Path(__file__).resolve().parents[1])
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"Fake Ollama server exited with code {process.returncode}")
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{args.ollama_port}/api/tags", timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Fake Ollama server did not start within {timeout} seconds")
+                time.sleep(0.1)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+async def run(args) -> dict:
+    from app.document_store import ChromaDocStore
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        paths = generate_corpus(Path(corpus_dir), args.pdfs, args.markdown, args.pages, seed=args.seed)
+        store = ChromaDocStore()
+        ingestion = benchmark_ingestion(store, paths, args.batch_size)
+
+    with fake_ollama_process(args):
+        query = await benchmark_queries(store, generate_questions(args.queries, seed=args.seed), args.concurrency)
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "config": vars(args),
+        "ingestion": ingestion,
+        "query": query,
+        "memory_peak_mb": memory_peak_mb()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion and query performance")
+    parser.add_argument("--pdfs", type=int, default=5, help="Number of synthetic PDF files")
+    parser.add_argument("--markdown", type=int, default=5, help="Number of synthetic markdown files")
+    parser.add_argument("--pages", type=int, default=10, help="Pages per PDF file")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per add_documents call")
+    parser.add_argument("--queries", type=int, default=50, help="Number of queries to run")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent queries")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Fake Ollama token rate")
+    parser.add_argument("--response-tokens", type=int, default=100, help="Tokens per fake Ollama response")
+    parser.add_argument("--first-token-delay", type=float, default=0.1, help="Fake Ollama delay before the first token")
+    parser.add_argument("--ollama-port", type=int, default=11555, help="Port of the fake Ollama server")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmarks/results", help="Directory for the JSON results")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    # Must be set before the app modules read their configuration
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{args.ollama_port}"
+    os.environ["OLLAMA_MODEL"] = "fake"
+    # Always use a throwaway in-process store, never a shared Chroma server
+    os.environ["CHROMA_MODE"] = "embedded"
+    os.environ["CHROMA_IS_PERSISTENT"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{results['git_commit']}.json"
+    output_path.write_text(json.dumps(results, indent=2))
+    print(f"Saved results to {output_path}")
+
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Retrieval quality-vs-latency sweep over chunking and search parameters.
+
+Builds an index for every (CHUNK_SIZE, CHUNK_OVERLAP) combination from a
+directory of documents and evaluates a labeled question set against it for
+every N_RESULTS and DISTANCE_THRESHOLD value. Extracted text is cached on disk
+by file hash, so only splitting and embedding are repeated per configuration.
+
+The labeled set is a JSON lines file, one question per line:
+    {"question": "How do I reset the device?", "sources": ["manual.pdf"], "pages": [12, 13]}
+"pages" is optional; without it any chunk from a listed source counts as relevant.
+
+Usage (from the backend directory):
+    python -m benchmarks.sweep_retrieval docs/ questions.jsonl \
+        --chunk-sizes 500 1000 1500 --chunk-overlaps 100 200 \
+        --n-results 3 5 10 --distance-thresholds 1.0 1.5 --target-recall 0.9
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .run_benchmark import percentile, git_commit
+
+
+def load_labeled_set(path: str) -> list:
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def extract_with_cache(store, path: Path, cache_dir: Path) -> list:
+    """Extract a document, reusing a previous extraction of identical content"""
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    cache_path = cache_dir / f"{digest}.json"
+    if cache_path.exists():
+        documents = json.loads(cache_path.read_text(encoding='utf-8'))
+    else:
+        documents = store.extract_text_from_file(path, path.name)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps(documents), encoding='utf-8')
+    # The cache is keyed by content, so the same file may have been cached under another name
+    for doc in documents:
+        doc['file_name'] = path.name
+    return documents
+
+
+def is_relevant(metadata: dict, example: dict) -> bool:
+    if metadata.get('file_name') not in example['sources']:
+        return False
+    pages = example.get('pages')
+    return not pages or metadata.get('page_number') in pages
+
+
+def estimate_tokens(prompt: list) -> int:
+    # Rough estimate of ~4 characters per token, good enough for relative comparison
+    return sum(len(message['content']) for message in prompt) // 4
+
+
+def evaluate(store, examples: list, n_results: int, distance_thresholds: list) -> list:
+    """Run every question once and score it for each distance threshold"""
+    from app.rag_pipeline import build_prompt
+
+    latencies = []
+    retrieved = []
+    for example in examples:
+        start = time.perf_counter()
+        results = store.query_documents(example['question'], n_results=n_results, distance_threshold=float('inf'))
+        latencies.append(time.perf_counter() - start)
+        retrieved.append(results)
+
+    rows = []
+    for threshold in distance_thresholds:
+        hits = 0
+        reciprocal_ranks = 0.0
+        prompt_tokens = []
+        for example, results in zip(examples, retrieved):
+            kept = [i for i, dist in enumerate(results['distances'][0]) if dist <= threshold]
+            filtered = {
+                'documents': [[results['documents'][0][i] for i in kept]],
+                'metadatas': [[results['metadatas'][0][i] for i in kept]]
+            }
+            for rank, metadata in enumerate(filtered['metadatas'][0], start=1):
+                if is_relevant(metadata, example):
+                    hits += 1
+                    reciprocal_ranks += 1.0 / rank
+                    break
+            prompt_tokens.append(estimate_tokens(build_prompt(example['question'], filtered)))
+
+        rows.append({
+            "n_results": n_results,
+            "distance_threshold": threshold,
+            "recall_at_k": hits / len(examples),
+            "mrr": reciprocal_ranks / len(examples),
+            "mean_prompt_tokens": sum(prompt_tokens) / len(prompt_tokens),
+            "retrieval_latency_p50": percentile(latencies, 50),
+            "retrieval_latency_p95": percentile(latencies, 95)
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep chunking and search parameters against a labeled question set")
+    parser.add_argument("documents", help="Directory with the documents to index")
+    parser.add_argument("labeled_set", help="JSON lines file with question, sources and optional pages")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[500, 1000, 1500])
+    parser.add_argument("--chunk-overlaps", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--n-results", type=int, nargs="+", default=[3, 5, 10])
+    parser.add_argument("--distance-thresholds", type=float, nargs="+", default=[1.0, 1.5])
+    parser.add_argument("--target-recall", type=float, default=0.9, help="Recall the recommended configuration must reach")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per add_documents call")
+    parser.add_argument("--cache-dir", default="benchmarks/.cache/extraction", help="Directory for cached extractions")
+    parser.add_argument("--output", default="benchmarks/results", help="Directory for the JSON results")
+    args = parser.parse_args()
+
+    # Must be set before the app modules read their configuration
+    # Always use a throwaway in-process store, never a shared Chroma server
+    os.environ["CHROMA_MODE"] = "embedded"
+    os.environ["CHROMA_IS_PERSISTENT"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from app.document_store import ChromaDocStore
+    from app.ingestion_jobs import build_chunks
+
+    examples = load_labeled_set(args.labeled_set)
+    paths = sorted(p for p in Path(args.documents).iterdir() if p.is_file())
+    store = ChromaDocStore()
+    documents = []
+    for path in paths:
+        documents.extend(extract_with_cache(store, path, Path(args.cache_dir)))
+    print(f"Loaded {len(documents)} pages from {len(paths)} files and {len(examples)} labeled questions")
+
+    rows = []
+    for chunk_size in args.chunk_sizes:
+        for chunk_overlap in args.chunk_overlaps:
+            if chunk_overlap >= chunk_size:
+                continue
+            store.clear_documents()
+            store.text_splitter = ChromaDocStore.make_text_splitter(chunk_size, chunk_overlap)
+            processed_docs, processed_metas = build_chunks(store, documents)
+            start = time.perf_counter()
+            for offset in range(0, len(processed_docs), args.batch_size):
+                store.add_documents(processed_docs[offset:offset + args.batch_size], processed_metas[offset:offset + args.batch_size])
+            index_seconds = time.perf_counter() - start
+
+            for n_results in args.n_results:
+                for row in evaluate(store, examples, n_results, args.distance_thresholds):
+                    row.update({
+                        "chunk_size": chunk_size,
+                        "chunk_overlap": chunk_overlap,
+                        "chunks": len(processed_docs),
+                        "index_seconds": index_seconds
+                    })
+                    rows.append(row)
+                    print(
+                        f"size={chunk_size:5d} overlap={chunk_overlap:4d} n={n_results:3d} threshold={row['distance_threshold']:.2f} "
+                        f"recall@{n_results}={row['recall_at_k']:.3f} mrr={row['mrr']:.3f} tokens={row['mean_prompt_tokens']:.0f} "
+                        f"p50={row['retrieval_latency_p50'] * 1000:.1f}ms"
+                    )
+
+    candidates = [row for row in rows if row['recall_at_k'] >= args.target_recall]
+    recommended = min(candidates, key=lambda row: (row['mean_prompt_tokens'], row['retrieval_latency_p50'])) if candidates else None
+    if recommended:
+        print(
+            f"Recommended: CHUNK_SIZE={recommended['chunk_size']} CHUNK_OVERLAP={recommended['chunk_overlap']} "
+            f"N_RESULTS={recommended['n_results']} DISTANCE_THRESHOLD={recommended['distance_threshold']}"
+        )
+    else:
+        print(f"No configuration reached the target recall of {args.target_recall}")
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / f"sweep_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{git_commit()}.json"
+    output_path.write_text(json.dumps({
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "config": vars(args),
+        "results": rows,
+        "recommended": recommended
+    }, indent=2))
+    print(f"Saved results to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Shared embedding server.
+
+Loads the sentence-transformers model once and serves embeddings over HTTP, so
+backend workers started with EMBEDDING_SERVICE_URL do not each load a copy.
+
+Usage:
+    uvicorn embedding_server:app --host 0.0.0.0 --port 8001
+"""
+import os
+from pathlib import Path
+from typing import List
+import numpy as np
+from fastapi import FastAPI
+from pydantic import BaseModel
+from dotenv import load_dotenv
+from chromadb.utils import embedding_functions
+from app.logger_config import get_logger, log_time
+
+# Load the root .env so the server uses the same EMBEDDING_MODEL as the backend
+load_dotenv(dotenv_path=Path(__file__).resolve().parents[1] / '.env')
+
+logger = get_logger(__name__)
+
+MODEL_NAME = os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=MODEL_NAME)
+logger.info(f"Loaded embedding model {MODEL_NAME}")
+
+app = FastAPI()
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+
+@app.post("/embed")
+@log_time(logger)
+def embed(request: EmbedRequest):
+    # Plain def so FastAPI runs the CPU-bound encoding in its thread pool
+    embeddings = embedding_function(request.texts)
+    return {"embeddings": np.asarray(embeddings, dtype=np.float32).tolist()}
+
+@app.get("/info")
+def info():
+    return {"model": MODEL_NAME}
@@ -1,13 +1,20 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Form, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from app.rag_pipeline import rag_pipeline
-from app.document_store import ChromaDocStore
-from typing import List, Dict, Any
+from fastapi.responses import StreamingResponse, JSONResponse
+from pydantic import BaseModel, Field
+from app.rag_pipeline import rag_pipeline, batch_rag_pipeline
+from app.document_store import ChromaDocStore, CollectionNotFoundError
+from app.ingestion_jobs import IngestionJobManager
+from app.file_spool import UploadTooLargeError, get_max_upload_request_size
+from app.snapshot import export_snapshot, import_snapshot, list_snapshots, get_snapshot_dir
+from typing import List, Dict, Any, Tuple
 import json
+import os
+import asyncio
+import time
+from pathlib import Path
 import uvicorn
-from app.logger_config import get_logger, log_time
+from app.logger_config import get_logger, log_time, request_id_var, new_request_id
 
 # Initialize logger
 logger = get_logger(__name__)
@@ -15,6 +22,9 @@ logger = get_logger(__name__)
 # Initialize ChromaDB store
 chroma_store = ChromaDocStore()
 
+# Initialize background ingestion
+ingestion_jobs = IngestionJobManager(chroma_store)
+
 # Initialize FastAPI
 app = FastAPI()
 
@@ -27,11 +37,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def start_ingestion_workers():
+    await ingestion_jobs.start()
+
+@app.on_event("shutdown")
+async def stop_ingestion_workers():
+    await ingestion_jobs.stop()
+
+@app.middleware("http")
+async def upload_size_middleware(request: Request, call_next):
+    """Reject oversized uploads from their Content-Length, before the multipart body is received and parsed"""
+    if request.url.path == "/documents/upload":
+        max_size = get_max_upload_request_size()
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_size:
+            logger.error(f"Rejected upload of {content_length} bytes")
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Upload exceeds the maximum request size of {max_size // (1024 * 1024)} MB"}
+            )
+    return await call_next(request)
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Tag all log records emitted while serving a request with its request ID"""
+    request_id = request.headers.get("X-Request-ID") or new_request_id()
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+def require_collection(name: str | None):
+    """Respond with 404 if the requested collection does not exist"""
+    try:
+        chroma_store.get_collection(name)
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+class QueryFilters(BaseModel):
+    file_names: List[str] = []  # Only search these files
+    file_types: List[str] = []  # Only search these MIME types, e.g. application/pdf
+    page_ranges: List[Tuple[int, int]] = []  # Inclusive (start, end) page ranges
+
+    def to_where(self):
+        return ChromaDocStore.build_where_clause(self.file_names, self.file_types, self.page_ranges)
+
 class QueryRequest(BaseModel):
     question: str
     messages: List[Dict[str, str]] = []  # Chat history
     previous_chunks: List[str] = []  # Optional: Previous relevant chunks
     model: str | None = None  # Optional: Model name
+    filters: QueryFilters | None = None  # Optional: Restrict retrieval by metadata
+    collection: str | None = None  # Optional: Collection to search, defaults to CHROMA_DEFAULT_COLLECTION
 
 @app.post("/query")
 @log_time(logger)
@@ -40,6 +101,7 @@ async def query_service(request: QueryRequest):
     Streaming endpoint with proper async handling
     """
     logger.info(f"Received query request with question: {request.question}")
+    require_collection(request.collection)
 
     async def generate():
         try:
@@ -48,7 +110,9 @@ async def query_service(request: QueryRequest):
                 chroma_store, 
                 request.question,
                 request.messages,
-                model=request.model
+                model=request.model,
+                where=request.filters.to_where() if request.filters else None,
+                collection_name=request.collection
             ):
                 if chunk:
                     message = json.dumps({"answer": chunk})
@@ -69,26 +133,133 @@ async def query_service(request: QueryRequest):
         }
     )
 
+BATCH_MAX_QUESTIONS = int(os.getenv('BATCH_MAX_QUESTIONS', 100))
+
+class BatchQueryRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_QUESTIONS)
+    model: str | None = None  # Optional: Model name
+    filters: QueryFilters | None = None  # Optional: Restrict retrieval by metadata
+    max_concurrency: int | None = Field(None, gt=0)  # Optional: Concurrent generations, capped by BATCH_MAX_CONCURRENCY
+    collection: str | None = None  # Optional: Collection to search, defaults to CHROMA_DEFAULT_COLLECTION
+
+@app.post("/query/batch")
+@log_time(logger)
+async def batch_query_service(request: BatchQueryRequest):
+    """
+    Answer many questions at once, streaming one NDJSON line per answered question
+    """
+    logger.info(f"Received batch query request with {len(request.questions)} questions")
+    require_collection(request.collection)
+
+    async def generate():
+        try:
+            async for result in batch_rag_pipeline(
+                chroma_store,
+                request.questions,
+                model=request.model,
+                where=request.filters.to_where() if request.filters else None,
+                max_concurrency=request.max_concurrency,
+                collection_name=request.collection
+            ):
+                yield json.dumps(result) + "\n"
+
+        except Exception as e:
+            logger.error(f"Error in batch query streaming: {str(e)}", exc_info=True)
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 @app.get("/config")
 @log_time(logger)
 async def get_config():
     logger.info("Fetching chunking configuration")
     return chroma_store.get_chunking_config()
 
+class CollectionRequest(BaseModel):
+    name: str
+    space: str | None = None  # Optional: Distance metric (l2, cosine or ip), defaults to HNSW_SPACE
+    m: int | None = None  # Optional: HNSW graph degree, defaults to HNSW_M
+    construction_ef: int | None = None  # Optional: HNSW build candidate list size, defaults to HNSW_CONSTRUCTION_EF
+    search_ef: int | None = None  # Optional: HNSW search candidate list size, defaults to HNSW_SEARCH_EF
+
+@app.get("/collections")
+@log_time(logger)
+async def list_collections():
+    logger.info("Fetching collections")
+    return {"collections": chroma_store.list_collections()}
+
+@app.post("/collections")
+@log_time(logger)
+async def create_collection(request: CollectionRequest):
+    try:
+        chroma_store.create_collection(
+            request.name,
+            space=request.space,
+            m=request.m,
+            construction_ef=request.construction_ef,
+            search_ef=request.search_ef
+        )
+    except Exception as e:
+        logger.error(f"Failed to create collection {request.name}: {str(e)}", exc_info=True)
+        return {"status": "error", "message": f"Failed to create collection: {str(e)}"}
+    return {"status": "success", "message": f"Collection {request.name} created successfully"}
+
+class SnapshotRequest(BaseModel):
+    name: str | None = None  # Optional: Snapshot name, defaults to <collection>_<timestamp>
+    dtype: str = "float32"  # Embedding precision, float32 or float16
+
+class RestoreRequest(BaseModel):
+    collection: str | None = None  # Optional: Target collection, defaults to the snapshot's collection
+    replace: bool = False  # Recreate the target collection with the snapshot's index settings
+
+@app.post("/collections/{collection}/snapshot")
+@log_time(logger)
+async def create_snapshot(collection: str, request: SnapshotRequest):
+    require_collection(collection)
+    name = Path(request.name or f"{collection}_{time.strftime('%Y%m%d_%H%M%S')}").name
+    try:
+        manifest = await asyncio.to_thread(
+            export_snapshot, chroma_store, get_snapshot_dir() / name, collection, request.dtype
+        )
+    except Exception as e:
+        logger.error(f"Failed to export snapshot of {collection}: {str(e)}", exc_info=True)
+        return {"status": "error", "message": f"Failed to export snapshot: {str(e)}"}
+    return {"status": "success", "message": f"Exported {manifest['count']} chunks to snapshot {name}", "snapshot": name}
+
+@app.get("/snapshots")
+@log_time(logger)
+async def get_snapshots():
+    return {"snapshots": list_snapshots()}
+
+@app.post("/snapshots/{name}/restore")
+@log_time(logger)
+async def restore_snapshot(name: str, request: RestoreRequest):
+    path = get_snapshot_dir() / Path(name).name
+    if not path.is_dir():
+        raise HTTPException(status_code=404, detail=f"Snapshot {name} not found")
+    try:
+        result = await asyncio.to_thread(import_snapshot, chroma_store, path, request.collection, request.replace)
+    except Exception as e:
+        logger.error(f"Failed to restore snapshot {name}: {str(e)}", exc_info=True)
+        return {"status": "error", "message": f"Failed to restore snapshot: {str(e)}"}
+    return {"status": "success", "message": f"Restored {result['count']} chunks into {result['collection']}"}
+
 @app.get("/documents")
 @log_time(logger)
-async def get_documents():
+async def get_documents(collection: str | None = None):
     logger.info("Fetching all documents")
-    results = chroma_store.get_all_documents()
+    require_collection(collection)
+    results = chroma_store.get_all_documents(collection)
     logger.info(f"Retrieved {len(results)} documents")
     return results
 
 @app.post("/documents/clear")
 @log_time(logger)
-async def clear_documents():
+async def clear_documents(collection: str | None = None):
+    require_collection(collection)
     try:
         logger.info("Attempting to clear all documents")
-        success = chroma_store.clear_documents()
+        success = chroma_store.clear_documents(collection)
         if success:
             logger.info("Successfully cleared all documents")
             return {"status": "success", "message": "Documents cleared successfully"}
@@ -100,66 +271,36 @@ async def clear_documents():
 
 @app.post("/documents/upload")
 @log_time(logger)
-async def upload_documents(files: List[UploadFile] = File(...)):
+async def upload_documents(files: List[UploadFile] = File(...), collection: str | None = Form(None)):
     logger.info(f"Received {len(files)} files for upload")
     for file in files:
         logger.debug(f"File details - name: {file.filename}, content_type: {file.content_type}, size: {file.size if hasattr(file, 'size') else 'unknown'}")
     
-    all_documents = []
-    errors = []
-    
-    for file in files:
-        try:
-            # Process the file content
-            documents = await chroma_store.extract_text_from_document(file)
-            if documents:
-                all_documents.extend(documents)
-                logger.info(f"Successfully processed {file.filename}")
-            else:
-                errors.append(f"No documents extracted from {file.filename}")
-        except Exception as e:
-            error_msg = f"Error processing {file.filename}: {str(e)}"
-            logger.error(error_msg)
-            errors.append(error_msg)
-        finally:
-            # Ensure we close the file
+    try:
+        job_id = await ingestion_jobs.submit(files, collection_name=collection)
+    except UploadTooLargeError as e:
+        logger.error(f"Rejected upload: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to queue upload: {str(e)}", exc_info=True)
+        return {"status": "error", "message": f"Failed to queue upload: {str(e)}"}
+    finally:
+        for file in files:
             await file.close()
-    
-    if not all_documents:
-        error_summary = "\n".join(errors)
-        return {
-            "status": "error", 
-            "message": f"No documents were successfully processed. Errors:\n{error_summary}"
-        }
-    
-    # Process the successful documents
-    processed_docs = []
-    processed_metas = []
-    
-    for doc in all_documents:
-        chunks = chroma_store.text_splitter.split_text(doc['text'])
-        # Calculate page range for each chunk
-        for j, chunk in enumerate(chunks):
-            processed_docs.append(chunk)
-            # Ensure all metadata fields have valid values
-            metadata = {
-                'source': str(doc.get('file_name', 'unknown')),
-                'type': doc.get('file_type', 'unknown'),  # Use file_type from document
-                'file_name': str(doc.get('file_name', 'unknown')),
-                'page_number': str(doc.get('page_number', 'unknown')),
-                'page_range': f"{doc.get('page_number', 'unknown')}",
-                'chunk_num': str(j + 1),
-                'total_chunks': str(len(chunks))
-            }
-            processed_metas.append(metadata)
-    
-    success = chroma_store.add_documents(processed_docs, processed_metas)
-    if success:
-        logger.info(f"Successfully added {len(processed_docs)} chunks to the database")
-        return {"status": "success", "message": f"Successfully processed {len(files)} files"}
-    else:
-        logger.error("Failed to add documents to database")
-        return {"status": "error", "message": "Failed to add documents to database"}
+
+    return {"status": "queued", "job_id": job_id, "message": f"Queued {len(files)} files for processing"}
+
+@app.get("/jobs")
+@log_time(logger)
+async def list_jobs():
+    return {"jobs": ingestion_jobs.list_jobs()}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = ingestion_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""
+Export and import vector store snapshots without going through the API.
+
+Useful to warm-start a new node before the backend is started.
+
+Usage:
+    python manage_snapshots.py export documents snapshots/documents_backup --dtype float16
+    python manage_snapshots.py import snapshots/documents_backup --collection documents --replace
+"""
+import argparse
+from pathlib import Path
+from app.document_store import ChromaDocStore
+from app.snapshot import export_snapshot, import_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import ChromaDB collection snapshots")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export a collection to a snapshot directory")
+    export_parser.add_argument("collection", help="Collection to export")
+    export_parser.add_argument("path", help="Snapshot directory to create")
+    export_parser.add_argument("--dtype", choices=["float32", "float16"], default="float32", help="Embedding precision")
+
+    import_parser = subparsers.add_parser("import", help="Import a snapshot directory into a collection")
+    import_parser.add_argument("path", help="Snapshot directory to import")
+    import_parser.add_argument("--collection", help="Target collection, defaults to the snapshot's collection")
+    import_parser.add_argument("--replace", action="store_true", help="Recreate the target collection with the snapshot's index settings")
+
+    args = parser.parse_args()
+    store = ChromaDocStore()
+    if args.command == "export":
+        manifest = export_snapshot(store, Path(args.path), args.collection, args.dtype)
+        print(f"Exported {manifest['count']} chunks from {manifest['collection']} to {args.path}")
+    else:
+        result = import_snapshot(store, Path(args.path), args.collection, args.replace)
+        print(f"Imported {result['count']} chunks into {result['collection']}")
+
+
+if __name__ == "__main__":
+    main()
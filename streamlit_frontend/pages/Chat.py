@@ -11,6 +11,14 @@ load_dotenv(dotenv_path=root_dir / '.env', override=True)
 BACKEND_URL = f"{os.getenv('BACKEND_URL')}/query"
 MODEL = os.getenv('OLLAMA_MODEL')
 
+def get_collections() -> list:
+    try:
+        response = requests.get(f"{os.getenv('BACKEND_URL')}/collections")
+        response.raise_for_status()
+        return [c["name"] for c in response.json()["collections"]]
+    except requests.exceptions.RequestException:
+        return []
+
 def test_backend_connection() -> bool:
     try:
         with requests.post(
@@ -61,7 +69,11 @@ if st.session_state.backend_connected:
             try:
                 with requests.post(
                     BACKEND_URL,
-                    json={"question": prompt, "messages": st.session_state.messages[:-1]},
+                    json={
+                        "question": prompt,
+                        "messages": st.session_state.messages[:-1],
+                        "collection": st.session_state.get("collection")
+                    },
                     stream=True,
                     headers={"Accept": "text/event-stream"}
                 ) as response:
@@ -100,6 +112,11 @@ with st.sidebar:
     # Model info
     st.markdown("---")
     st.markdown(f"**Model:** {MODEL}")
+
+    # Collection selection
+    collections = get_collections()
+    if collections:
+        st.selectbox("Collection", collections, key="collection")
     
     # Clear chat button
     st.markdown("---")
@@ -2,21 +2,22 @@ import streamlit as st
 import os
 import sys
 import requests
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv(dotenv_path='../../.env')
 BACKEND_URL = os.getenv('BACKEND_URL')
 
-def make_request(endpoint: str, method: str = "GET", json_data: dict = None, files: list = None):
+def make_request(endpoint: str, method: str = "GET", json_data: dict = None, files: list = None, params: dict = None, data: dict = None):
     try:
         url = f"{BACKEND_URL}/{endpoint}"
         if method == "GET":
-            response = requests.get(url)
+            response = requests.get(url, params=params)
         elif files:
-            response = requests.post(url, files=files)
+            response = requests.post(url, files=files, data=data, params=params)
         else:
-            response = requests.post(url, json=json_data)
+            response = requests.post(url, json=json_data, params=params)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -28,6 +29,25 @@ def get_config():
 
 st.title("Document Database Management")
 
+# Collection selection
+collections_response = make_request("collections")
+collection_names = [c["name"] for c in collections_response["collections"]] if collections_response else []
+with st.sidebar:
+    st.header("Collection")
+    new_collection = st.text_input("New collection name")
+    if new_collection and st.button("Create Collection"):
+        response = make_request("collections", method="POST", json_data={"name": new_collection})
+        if response and response.get("status") == "success":
+            st.success(response["message"])
+            st.rerun()
+        elif response:
+            st.error(response.get("message", "Failed to create collection"))
+    collection = st.selectbox("Active collection", collection_names) if collection_names else None
+    if collections_response:
+        for c in collections_response["collections"]:
+            st.markdown(f"- **{c['name']}**: {c['count']} chunks")
+collection_params = {"collection": collection} if collection else None
+
 # File upload section
 st.header("Upload Documents")
 uploaded_files = st.file_uploader("Choose PDF files", type=['pdf'], accept_multiple_files=True)
@@ -35,19 +55,57 @@ uploaded_files = st.file_uploader("Choose PDF files", type=['pdf'], accept_multi
 if uploaded_files:
     if st.button("Process and Ingest Files"):
         files = [("files", file) for file in uploaded_files]
-        response = make_request("documents/upload", method="POST", files=files)
+        response = make_request("documents/upload", method="POST", files=files, data=collection_params)
         
         if not response:
             st.error("Failed to upload documents")
-        elif response.get("status") == "success":
-            st.success(response.get("message", "Successfully uploaded files!"))
+        elif response.get("status") == "queued":
+            job_id = response["job_id"]
+            st.info(response.get("message", "Files queued for processing"))
+            progress_bar = st.progress(0.0)
+            status_placeholder = st.empty()
+            files_placeholder = st.empty()
+
+            # Poll the ingestion job until it finishes
+            while True:
+                job = make_request(f"jobs/{job_id}")
+                if not job:
+                    break
+
+                files_done = sum(1 for f in job['files'] if f['status'] in ('done', 'failed'))
+                progress_bar.progress(files_done / max(len(job['files']), 1))
+                status_placeholder.markdown(
+                    f"**Status:** {job['status']} | **Chunks embedded:** {job['chunks_embedded']} | "
+                    f"**Throughput:** {job['chunks_per_second']:.1f} chunks/s"
+                )
+                files_placeholder.dataframe(
+                    {
+                        'File': [f['file_name'] for f in job['files']],
+                        'Status': [f['status'] for f in job['files']],
+                        'Pages': [f['pages'] for f in job['files']],
+                        'Chunks': [f"{f['chunks_embedded']}/{f['chunks_total']}" for f in job['files']]
+                    },
+                    hide_index=True
+                )
+
+                if job['status'] == 'completed':
+                    st.success(f"Successfully processed {len(job['files'])} files")
+                    break
+                if job['status'] == 'failed':
+                    st.error("Failed to upload documents")
+                    break
+                time.sleep(1)
+
+            if job:
+                for error in job['errors']:
+                    st.warning(error)
         else:
             st.error("Failed to upload documents: " + response.get("message", "Unknown error"))
 
 # Document listing section
 st.header("Stored Documents")
 if st.button("List Documents"):
-    results = make_request("documents")
+    results = make_request("documents", params=collection_params)
     if results and results.get('documents'):
         df_data = {
             'Source': [m.get('source', 'Unknown') for m in results['metadatas']],
@@ -69,7 +127,7 @@ if st.button("List Documents"):
 
 # Add clear database option
 if st.button("Clear Database"):
-    response = make_request("documents/clear", method="POST")
+    response = make_request("documents/clear", method="POST", params=collection_params)
     if response and response["status"] == "success":
         st.success("Database cleared successfully!")
     else: